@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SQLExecution:
     executed: bool
     success: bool
@@ -10,6 +10,7 @@ class SQLExecution:
     elapsed_ms: Optional[float]
     results: List[Any]
     error: Optional[str] = None
+    truncated: bool = False
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -18,11 +19,12 @@ class SQLExecution:
             "status": self.status,
             "elapsed_ms": self.elapsed_ms,
             "results": self.results,
+            "truncated": self.truncated,
             "error": self.error,
         }
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AgentStep:
     reasoning: str
     sql: Optional[str]
@@ -32,11 +34,11 @@ class AgentStep:
         return {
             "reasoning": self.reasoning,
             "sql": self.sql,
-            "execution": self.execution.to_dict(),
+            "execution": self.execution.to_dict() if self.execution is not None else None,
         }
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AgentResult:
     steps: List[AgentStep]
     final_answer: str
@@ -46,4 +48,3 @@ class AgentResult:
             "steps": [s.to_dict() for s in self.steps],
             "final_answer": self.final_answer,
         }
-
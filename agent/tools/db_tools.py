@@ -1,83 +1,154 @@
+from functools import lru_cache
 from pathlib import Path
 import sqlite3
-import re
 import time
+from typing import Optional
 
-from data.main import get_db_connection, get_database_schema
+from data.main import get_db_connection, get_database_schema, resolve_db_path
+
+
+_READ_PREFIXES = frozenset({(), ("explain",), ("explain", "query", "plan")})
+_READ_KEYWORDS = frozenset({"select", "with"})
+_PROHIBITED = frozenset({
+    "insert", "update", "delete", "replace", "create", "alter", "drop", "truncate", "attach", "detach",
+    "vacuum", "reindex", "analyze", "begin", "commit", "rollback", "savepoint", "release", "pragma",
+})
+
+
+@lru_cache(maxsize=64)
+def _cached_schema(db_path: str, mtime_ns: int):
+    # mtime_ns is part of the cache key only, so a rewritten file is re-introspected.
+    conn = get_db_connection(db_path)
+    try:
+        return get_database_schema(conn)
+    finally:
+        conn.close()
 
 
 def connect_to_db(db_file: str):
     """
     Connect to a database and return the connection and schema.
+
+    The schema is cached per (db path, mtime) and shared between calls; treat it as read-only.
     """
     conn = get_db_connection(db_file)
-    schema = get_database_schema(conn)
+    db_path = resolve_db_path(db_file)
+    schema = _cached_schema(str(db_path), db_path.stat().st_mtime_ns)
     return conn, schema
 
 
-def _strip_comments_and_literals(statement: str) -> str:
-    statement = re.sub(r"/\*.*?\*/", " ", statement, flags=re.S)
-    statement = re.sub(r"--.*?(|$)", " ", statement)
-    statement = re.sub(r"'([^']|'')*'", "''", statement)
-    return statement
-
 def _is_read_only(statement: str) -> bool:
-    cleaned = _strip_comments_and_literals(statement).strip().lower().strip(';')
-    if not re.match(r"^\s*(?:explain\s+(?:query\s+plan\s+)?)?(select|with)\b", cleaned):
-        return False
-    prohibited = (
-        r"\b(insert|update|delete|replace|create|alter|drop|truncate|attach|detach|vacuum|"
-        r"reindex|analyze|begin|commit|rollback|savepoint|release|pragma)\b"
-    )
-    return re.search(prohibited, cleaned) is None
+    """
+    Single pass over the statement: skips comments and string literals, requires the
+    first keyword(s) to be [EXPLAIN [QUERY PLAN]] SELECT/WITH and rejects on any
+    prohibited keyword.
+
+    Before the read keyword only whitespace, comments and one leading run of ';' are
+    allowed, as with the former strip(';') + prefix-regex check.
+    """
+    n = len(statement)
+    i = 0
+    prefix = ()
+    leading = True
+    # 0: no ';' seen yet, 1: inside the leading ';' run, 2: run ended, no more ';' allowed
+    semicolon_run = 0
+    while i < n:
+        ch = statement[i]
+        if ch == "'":
+            if leading:
+                return False
+            j = statement.find("'", i + 1)
+            while j != -1 and statement.startswith("''", j):
+                j = statement.find("'", j + 2)
+            if j != -1:
+                i = j + 1
+                continue
+        elif ch == "/" and statement.startswith("/*", i):
+            j = statement.find("*/", i + 2)
+            if j != -1:
+                i = j + 2
+                if semicolon_run == 1:
+                    semicolon_run = 2
+                continue
+        elif ch == "-" and statement.startswith("--", i):
+            j = statement.find("\n", i + 2)
+            i = n if j == -1 else j + 1
+            if semicolon_run == 1:
+                semicolon_run = 2
+            continue
+        if ch.isalnum() or ch == "_":
+            j = i + 1
+            while j < n and (statement[j].isalnum() or statement[j] == "_"):
+                j += 1
+            word = statement[i:j].lower()
+            i = j
+            if leading:
+                if word in _READ_KEYWORDS and prefix in _READ_PREFIXES:
+                    leading = False
+                elif prefix + (word,) == ("explain", "query", "plan")[:len(prefix) + 1]:
+                    prefix += (word,)
+                else:
+                    return False
+            elif word in _PROHIBITED:
+                return False
+            continue
+        if leading:
+            if ch == ";" and not prefix and semicolon_run < 2:
+                semicolon_run = 1
+            elif ch.isspace():
+                if semicolon_run == 1:
+                    semicolon_run = 2
+            else:
+                return False
+        i += 1
+    return not leading
+
+
+# SQLite VM instructions between deadline checks
+_PROGRESS_HANDLER_OPCODES = 10000
 
 
 def _progress_handler_generator(deadline):
-    def _progress_handler():
-        if deadline is not None and time.monotonic() >= deadline:
-            return 1
-        return 0
+    # Bind the clock and deadline as defaults so each callback avoids global/closure lookups.
+    def _progress_handler(_now=time.monotonic, _deadline=deadline):
+        return 1 if _now() >= _deadline else 0
     return _progress_handler
 
 
-def safe_query(conn: sqlite3.Connection, sql: str, msx_ms: int):
+def safe_query(conn: sqlite3.Connection, sql: str, msx_ms: int, max_rows: Optional[int] = 1000):
     start = time.monotonic()
+    rows = []
+    truncated = False
 
     if not _is_read_only(sql):
-        elapsed = (time.monotonic() - start) * 1000.0
-        return {
-            "success": False,
-            "status": "NoSafe",
-            "elapsed_ms": elapsed,
-            "results": [],
-            "error": "Query rejected by read-only policy",
-        }
-
-    deadline = start + (msx_ms / 1000.0) if msx_ms and msx_ms > 0 else None
-    _progress_handler = _progress_handler_generator(deadline)
-
-    conn.set_progress_handler(_progress_handler, 1000)
-    try:
-        cursor = conn.cursor()
-        cursor.execute(sql)
-        rows = cursor.fetchall()
-        elapsed = (time.monotonic() - start) * 1000.0
-        return {
-            "success": True,
-            "status": "success",
-            "elapsed_ms": elapsed,
-            "results": rows,
-            "error": None,
-        }
-    except sqlite3.Error as exc:
-        status = "TimeOut" if "interrupted" in str(exc).lower() else "ExecFailed"
-        elapsed = (time.monotonic() - start) * 1000.0
-        return {
-            "success": False,
-            "status": status,
-            "elapsed_ms": elapsed,
-            "results": [],
-            "error": str(exc),
-        }
-    finally:
-        conn.set_progress_handler(None, 0)
+        success, status, error = False, "NoSafe", "Query rejected by read-only policy"
+    else:
+        if msx_ms and msx_ms > 0:
+            deadline = start + (msx_ms / 1000.0)
+            conn.set_progress_handler(_progress_handler_generator(deadline), _PROGRESS_HANDLER_OPCODES)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql)
+            if max_rows and max_rows > 0:
+                # Fetch one extra row to detect truncation without materializing the full result set.
+                cursor.arraysize = max_rows + 1
+                rows = cursor.fetchmany(max_rows + 1)
+                truncated = len(rows) > max_rows
+                del rows[max_rows:]
+            else:
+                rows = cursor.fetchall()
+            success, status, error = True, "success", None
+        except sqlite3.Error as exc:
+            status = "TimeOut" if "interrupted" in str(exc).lower() else "ExecFailed"
+            success, error = False, str(exc)
+        finally:
+            conn.set_progress_handler(None, 0)
+
+    return {
+        "success": success,
+        "status": status,
+        "elapsed_ms": (time.monotonic() - start) * 1000.0,
+        "results": rows,
+        "truncated": truncated,
+        "error": error,
+    }
@@ -1,6 +1,9 @@
 from typing import List, Dict, Any, Iterable
 
-from data.helpers.utils import make_turn_uid
+from data.helpers.utils import make_turn_uid, disk_cached
+
+# Part of the normalized-turn cache key; bump when the normalizers' output changes.
+NORMALIZER_VERSION = 1
 
 
 def normalize_single_turn_rows(
@@ -61,7 +64,6 @@ def normalize_conversation_rows(
         conversation_id = str(interaction_id)
 
         interaction = conv.get("interaction", [])
-        prev_utterances: List[str] = []
         prev_gold_sqls: List[str] = []
         prev_events: List[Dict[str, str]] = []
 
@@ -78,12 +80,11 @@ def normalize_conversation_rows(
                 "db_id": db_id,
                 "dialect": "sqlite",
                 "text": text,
-                "context": prev_events.copy(),
-                "context_gold_sql": prev_gold_sqls.copy(),
+                "context": tuple(prev_events),
+                "context_gold_sql": tuple(prev_gold_sqls),
                 "gold_sql": gold_sql,
                 "difficulty": None,
             })
-            prev_utterances.append(text)
             prev_events.append({"type": "text", "value": text})
             if gold_sql:
                 prev_gold_sqls.append(gold_sql)
@@ -92,23 +93,25 @@ def normalize_conversation_rows(
     return out
 
 
+@disk_cached("spider", NORMALIZER_VERSION)
 def spider_dataset_normalize(spider) -> List[Dict[str, Any]]:
     """Normalize Spider dataset (single-turn)."""
     print("  Normalizing Spider...")
     turn_rows = []
     for split in spider.keys():
-        rows = (spider[split][i] for i in range(len(spider[split])))
+        rows = spider[split].to_list()
         turn_rows.extend(normalize_single_turn_rows(rows, dataset="spider", split=split))
     print(f"    {len(turn_rows)} turns")
     return turn_rows
 
 
+@disk_cached("bird", NORMALIZER_VERSION)
 def bird_dataset_normalize(bird) -> List[Dict[str, Any]]:
     """Normalize BIRD dataset (single-turn with evidence)."""
     print("  Normalizing BIRD...")
     turn_rows = []
     BIRD_SPLIT = "mini_dev_sqlite"  # Original HF split name
-    rows = (bird[BIRD_SPLIT][i] for i in range(len(bird[BIRD_SPLIT])))
+    rows = bird[BIRD_SPLIT].to_list()
     turn_rows.extend(
         normalize_single_turn_rows(
             rows, dataset="bird", split="validation"  # Map to validation
@@ -132,13 +135,13 @@ def cosql_dataset_normalize(cosql) -> List[Dict[str, Any]]:
     return turn_rows
 
 
+@disk_cached("sparc", NORMALIZER_VERSION)
 def sparc_dataset_normalize(sparc) -> List[Dict[str, Any]]:
     """Normalize SParC dataset (multi-turn conversations)."""
     print("  Normalizing SParC...")
     turn_rows = []
     for split in sparc.keys():
-        for i in range(len(sparc[split])):
-            r = sparc[split][i]
+        for i, r in enumerate(sparc[split].to_list()):
             # Check if it's conversational format
             is_conv = any(
                 isinstance(r.get(k), list)
@@ -153,7 +156,6 @@ def sparc_dataset_normalize(sparc) -> List[Dict[str, Any]]:
 
                 if isinstance(questions, list):
                     conversation_id = f"sparc:{split}:{i}"
-                    prev_utterances: List[str] = []
                     prev_gold_sqls: List[str] = []
                     prev_events: List[Dict[str, str]] = []
 
@@ -168,12 +170,11 @@ def sparc_dataset_normalize(sparc) -> List[Dict[str, Any]]:
                             "db_id": db_id,
                             "dialect": "sqlite",
                             "text": q,
-                            "context": prev_events.copy(),
-                            "context_gold_sql": prev_gold_sqls.copy(),
+                            "context": tuple(prev_events),
+                            "context_gold_sql": tuple(prev_gold_sqls),
                             "gold_sql": current_gold_sql,
                             "difficulty": None,
                         })
-                        prev_utterances.append(q)
                         prev_events.append({"type": "text", "value": q})
                         if current_gold_sql:
                             prev_gold_sqls.append(current_gold_sql)
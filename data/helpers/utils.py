@@ -1,7 +1,14 @@
+import functools
+import hashlib
 import json
+import os
 import sqlite3
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterable, List
+
+import orjson
 
 # Anchor all paths to the repository root (independent of current working directory)
 _PROJECT_ROOT = Path(__file__).resolve().parents[2]
@@ -15,6 +22,7 @@ SPIDER_DB_ROOT = (SPIDER_LOCAL_DIR / "database").resolve()
 BIRD_DB_ROOT = (_DATA_DIR / "external/bird_dataset/dev_databases").resolve()
 COSQL_LOCAL_DIR = (_DATA_DIR / "external/cosql_dataset").resolve()
 NORMALIZED_DIR = (_DATA_DIR / "normalized").resolve()
+NORMALIZED_CACHE_DIR = NORMALIZED_DIR / "cache"
 
 SPIDER_HF = "xlangai/spider"
 SPIDER_REPO = "prem-research/spider"
@@ -22,23 +30,42 @@ BIRD_HF = "birdsql/bird_mini_dev"
 SPARC_HF = "aherntech/sparc"
 
 
-def verify_database_connection(db_path: Path) -> bool:
-    """Verify if a database can be opened and queried."""
-    p = Path(db_path)
-    if not p.is_absolute():
-        p = _PROJECT_ROOT / p
-    con = sqlite3.connect(str(p))
+@functools.lru_cache(maxsize=None)
+def _verify_cached(path_str: str) -> bool:
+    # Read-only, immutable open: no locks taken and no journal files created next to the database.
+    # mode=ro also fails on a missing file, so no separate exists() check is needed.
+    try:
+        con = sqlite3.connect(f"{Path(path_str).as_uri()}?mode=ro&immutable=1", uri=True)
+    except sqlite3.Error:
+        return False
     try:
         cur = con.cursor()
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;")
-        tables = [r[0] for r in cur.fetchall()]
-        return len(tables) > 0
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' LIMIT 1;")
+        return cur.fetchone() is not None
+    except sqlite3.Error:
+        return False
     finally:
         con.close()
 
 
+def verify_database_connection(db_path: Path) -> bool:
+    """Verify if a database can be opened and queried (memoized per resolved path)."""
+    p = Path(db_path)
+    if not p.is_absolute():
+        p = _PROJECT_ROOT / p
+    return _verify_cached(str(p.resolve()))
+
+
+def verify_many(db_paths: Iterable[Path], workers: int = 16) -> Dict[Path, bool]:
+    """Verify several databases concurrently (sqlite releases the GIL while opening/reading)."""
+    db_paths = list(db_paths)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(db_paths, executor.map(verify_database_connection, db_paths)))
+
+
+@functools.lru_cache(maxsize=4096)
 def get_database_path(dataset: str, db_id: str) -> Optional[str]:
-    """Get the file path for a database given dataset and db_id."""
+    """Get the file path for a database given dataset and db_id (memoized, so each path is stat'ed once)."""
     if dataset in ["spider", "cosql", "sparc"]:
         db_path = SPIDER_DB_ROOT / db_id / f"{db_id}.sqlite"
         return str(db_path) if db_path.exists() else None
@@ -49,6 +76,58 @@ def get_database_path(dataset: str, db_id: str) -> Optional[str]:
     return None
 
 
+def _dataset_fingerprint(dataset) -> Optional[str]:
+    """Fingerprint a HuggingFace DatasetDict from its split fingerprints; None if unavailable."""
+    split_fingerprints = {}
+    for split in dataset.keys():
+        fingerprint = getattr(dataset[split], "_fingerprint", None)
+        if fingerprint is None:
+            return None
+        split_fingerprints[split] = fingerprint
+    payload = json.dumps(split_fingerprints, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def disk_cached(name: str, version: int):
+    """
+    Cache a normalizer's output under NORMALIZED_CACHE_DIR, keyed by the input dataset fingerprint
+    and the normalizer version (bump it whenever the normalizer's output changes).
+
+    Inputs that cannot be fingerprinted (e.g. CoSQL's local JSON) are always normalized.
+    Unreadable or corrupt cache files are treated as a miss and rewritten.
+    """
+    def decorator(normalize_fn):
+        @functools.wraps(normalize_fn)
+        def wrapper(dataset):
+            key = _dataset_fingerprint(dataset)
+            if key is None:
+                return normalize_fn(dataset)
+
+            cache_path = NORMALIZED_CACHE_DIR / f"{name}.v{version}.{key}.json"
+            try:
+                turns = json.loads(cache_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                pass
+            else:
+                print(f"  Loaded {len(turns)} cached {name} turns")
+                return turns
+
+            turns = normalize_fn(dataset)
+            NORMALIZED_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file and rename it into place so readers never see a partial entry
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=NORMALIZED_CACHE_DIR, suffix=".tmp", delete=False
+            ) as tmp:
+                json.dump(turns, tmp)
+            os.replace(tmp.name, cache_path)
+            for stale in NORMALIZED_CACHE_DIR.glob(f"{name}.*.json"):
+                if stale != cache_path:
+                    stale.unlink(missing_ok=True)
+            return turns
+        return wrapper
+    return decorator
+
+
 def make_turn_uid(dataset: str, split: str, conversation_id: str, turn_index: int) -> str:
     """Generate unique turn identifier."""
     return f"{dataset}:{split}:{conversation_id}:{turn_index}"
@@ -56,16 +135,17 @@ def make_turn_uid(dataset: str, split: str, conversation_id: str, turn_index: in
 
 def add_database_paths(turns: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Add db_file path to each turn for database access."""
+    # Many turns share a database; resolve each path relative to the project root only once
+    @functools.lru_cache(maxsize=None)
+    def _rel(abs_path: str) -> str:
+        return str(Path(abs_path).resolve().relative_to(_PROJECT_ROOT))
+
     for turn in turns:
         dataset = turn.get("dataset")
         db_id = turn.get("db_id")
         if dataset and db_id:
             abs_path = get_database_path(dataset, db_id)
-            if abs_path:
-                rel_path = str(Path(abs_path).resolve().relative_to(_PROJECT_ROOT))
-                turn["db_file"] = rel_path
-            else:
-                turn["db_file"] = None
+            turn["db_file"] = _rel(abs_path) if abs_path else None
     return turns
 
 
@@ -84,6 +164,14 @@ def save_to_sqlite(turns: List[Dict[str, Any]], output_path: Path):
     conn = sqlite3.connect(str(output_path))
     cursor = conn.cursor()
 
+    # Page size must be set before the first table is created
+    cursor.execute("PRAGMA page_size = 8192")
+
+    # The file is rebuilt from scratch on every run, so skip durability work during the bulk load
+    cursor.execute("PRAGMA journal_mode = MEMORY")
+    cursor.execute("PRAGMA synchronous = OFF")
+    cursor.execute("PRAGMA temp_store = MEMORY")
+
     # Create turns table
     cursor.execute("""
         CREATE TABLE turns (
@@ -103,11 +191,9 @@ def save_to_sqlite(turns: List[Dict[str, Any]], output_path: Path):
         )
     """)
 
-    # Insert data
-    for turn in turns:
-        cursor.execute("""
-            INSERT INTO turns VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+    # Insert data in a single executemany pass over row tuples
+    rows = (
+        (
             turn.get("turn_uid"),
             turn.get("dataset"),
             turn.get("split"),
@@ -117,16 +203,22 @@ def save_to_sqlite(turns: List[Dict[str, Any]], output_path: Path):
             turn.get("db_file"),
             turn.get("dialect"),
             turn.get("text"),
-            json.dumps(turn.get("context", [])),
-            json.dumps(turn.get("context_gold_sql", [])),
+            orjson.dumps(turn.get("context", [])).decode(),
+            orjson.dumps(turn.get("context_gold_sql", [])).decode(),
             turn.get("gold_sql"),
-            turn.get("difficulty")
-        ))
+            turn.get("difficulty"),
+        )
+        for turn in turns
+    )
+    with conn:
+        cursor.executemany("""
+            INSERT INTO turns VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
 
     # Create indexes for common queries
-    cursor.execute("CREATE INDEX idx_dataset ON turns(dataset)")
+    cursor.execute("CREATE INDEX idx_dataset_split ON turns(dataset, split)")
     cursor.execute("CREATE INDEX idx_db_id ON turns(db_id)")
-    cursor.execute("CREATE INDEX idx_conversation ON turns(conversation_id)")
+    cursor.execute("CREATE INDEX idx_conv_turn ON turns(conversation_id, turn_index)")
 
     conn.commit()
     conn.close()
@@ -6,10 +6,14 @@ Provides functions to:
 2. Get database connections for specific turns
 """
 
-import json
+import atexit
 import sqlite3
+import threading
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+
+import orjson
 
 
 # =============================================================================
@@ -23,6 +27,57 @@ NORMALIZED_DB = NORMALIZED_DIR / "turns.db"
 SPIDER_DB_ROOT = (BASE_DIR / "external" / "prem-research_spider" / "database").resolve()
 BIRD_DB_ROOT = (BASE_DIR / "external" / "bird_mini_dev" / "MINIDEV" / "dev_databases").resolve()
 
+# Dataset databases are only ever queried, never written
+DB_CONNECTION_PRAGMAS = (
+    "PRAGMA query_only = 1",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",
+    "PRAGMA mmap_size = 268435456",
+)
+
+
+# =============================================================================
+# Turns Database Connection
+# =============================================================================
+
+# Shared statement text for the turn lookups below
+_SQL_GET_TURN = "SELECT * FROM turns WHERE turn_uid = ?"
+_SQL_GET_CONVERSATION = "SELECT * FROM turns WHERE conversation_id = ? ORDER BY turn_index"
+
+_turns_local = threading.local()
+_turns_connections: List[sqlite3.Connection] = []
+_turns_connections_lock = threading.Lock()
+
+
+def _get_turns_connection() -> sqlite3.Connection:
+    """Per-thread read-only connection to turns.db, reopened when the file is rebuilt."""
+    mtime_ns = NORMALIZED_DB.stat().st_mtime_ns
+    cached = getattr(_turns_local, "conn", None)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+
+    if cached is not None:
+        with _turns_connections_lock:
+            _turns_connections.remove(cached[1])
+        cached[1].close()
+
+    conn = sqlite3.connect(f"{NORMALIZED_DB.as_uri()}?mode=ro", uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = 1")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    _turns_local.conn = (mtime_ns, conn)
+    with _turns_connections_lock:
+        _turns_connections.append(conn)
+    return conn
+
+
+@atexit.register
+def _close_turns_connections() -> None:
+    with _turns_connections_lock:
+        for conn in _turns_connections:
+            conn.close()
+        _turns_connections.clear()
+
 
 # =============================================================================
 # Data Loading Functions
@@ -56,15 +111,30 @@ def load_data(
         
         # Load all CoSQL data
         cosql = load_data(source='cosql')
+
+    Results are memoized per (turns.db mtime, arguments). Each call returns
+    fresh turn dicts; nested context lists are shared between calls.
     """
     if not NORMALIZED_DB.exists():
         raise FileNotFoundError(
             f"Unified database not found at {NORMALIZED_DB}. "
             "Please run helpers/prepare.py first."
         )
-    
-    conn = sqlite3.connect(str(NORMALIZED_DB))
-    cursor = conn.cursor()
+
+    turns = _load_data_cached(NORMALIZED_DB.stat().st_mtime_ns, source, split, limit, min_turn_index)
+    return [dict(turn) for turn in turns]
+
+
+@lru_cache(maxsize=8)
+def _load_data_cached(
+    mtime_ns: int,
+    source: Optional[str],
+    split: Optional[str],
+    limit: Optional[int],
+    min_turn_index: Optional[int],
+) -> Tuple[Dict[str, Any], ...]:
+    # mtime_ns only keys the cache, so rebuilding turns.db invalidates earlier loads
+    cursor = _get_turns_connection().cursor()
     
     # Build query
     query = "SELECT * FROM turns"
@@ -92,36 +162,40 @@ def load_data(
         query += f" LIMIT {limit}"
     
     cursor.execute(query, params)
-    rows = cursor.fetchall()
-    
-    # Get column names
-    columns = [desc[0] for desc in cursor.description]
-    conn.close()
     
-    # Convert to list of dicts and parse JSON fields
+    # Stream rows into dicts and parse JSON fields
     turns = []
-    for row in rows:
-        turn = dict(zip(columns, row))
+    for row in cursor:
+        turn = dict(row)
         # Parse JSON fields
-        turn["context"] = json.loads(turn.get("context", "[]"))
-        turn["context_gold_sql"] = json.loads(turn.get("context_gold_sql", "[]"))
+        turn["context"] = orjson.loads(turn.get("context", "[]"))
+        turn["context_gold_sql"] = orjson.loads(turn.get("context_gold_sql", "[]"))
         turns.append(turn)
     
-    return turns
+    return tuple(turns)
 
 
 # =============================================================================
 # Database Connection Functions
 # =============================================================================
 
-def get_db_connection(db_file) -> sqlite3.Connection:
+def resolve_db_path(db_file) -> Path:
+    """Resolve a turn's db_file (stored relative to the project root) to an absolute path."""
     db_path = Path(db_file)
     if not db_path.is_absolute():
         db_path = BASE_DIR.parent / db_path
+    return db_path
+
+
+def get_db_connection(db_file) -> sqlite3.Connection:
+    db_path = resolve_db_path(db_file)
     if not db_path.exists():
         raise FileNotFoundError(f"Database file not found: {db_file}\n")
-    
-    return sqlite3.connect(str(db_path))
+
+    conn = sqlite3.connect(f"{db_path.as_uri()}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+    for pragma in DB_CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
 
 
 def get_database_schema(db_connection) -> Dict[str, List[str]]:
@@ -165,25 +239,19 @@ def get_turn(turn_uid: str) -> Optional[Dict[str, Any]]:
     if not NORMALIZED_DB.exists():
         raise FileNotFoundError(f"Unified database not found at {NORMALIZED_DB}")
     
-    conn = sqlite3.connect(str(NORMALIZED_DB))
-    cursor = conn.cursor()
+    cursor = _get_turns_connection().cursor()
     
-    cursor.execute("""
-        SELECT * FROM turns
-        WHERE turn_uid = ?
-    """, (turn_uid,))
+    cursor.execute(_SQL_GET_TURN, (turn_uid,))
     
     row = cursor.fetchone()
-    columns = [desc[0] for desc in cursor.description]
-    conn.close()
     
     if not row:
         return None
     
     # Convert to dict and parse JSON fields
-    turn = dict(zip(columns, row))
-    turn["context"] = json.loads(turn.get("context", "[]"))
-    turn["context_gold_sql"] = json.loads(turn.get("context_gold_sql", "[]"))
+    turn = dict(row)
+    turn["context"] = orjson.loads(turn.get("context", "[]"))
+    turn["context_gold_sql"] = orjson.loads(turn.get("context_gold_sql", "[]"))
     
     return turn
 
@@ -209,25 +277,16 @@ def get_conversation(conversation_id: str) -> List[Dict[str, Any]]:
     if not NORMALIZED_DB.exists():
         raise FileNotFoundError(f"Unified database not found at {NORMALIZED_DB}")
 
-    conn = sqlite3.connect(str(NORMALIZED_DB))
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT * FROM turns
-        WHERE conversation_id = ?
-        ORDER BY turn_index
-    """, (conversation_id,))
+    cursor = _get_turns_connection().cursor()
 
-    rows = cursor.fetchall()
-    columns = [desc[0] for desc in cursor.description]
-    conn.close()
+    cursor.execute(_SQL_GET_CONVERSATION, (conversation_id,))
 
     # Convert to list of dicts
     turns = []
-    for row in rows:
-        turn = dict(zip(columns, row))
-        turn["context"] = json.loads(turn.get("context", "[]"))
-        turn["context_gold_sql"] = json.loads(turn.get("context_gold_sql", "[]"))
+    for row in cursor:
+        turn = dict(row)
+        turn["context"] = orjson.loads(turn.get("context", "[]"))
+        turn["context_gold_sql"] = orjson.loads(turn.get("context_gold_sql", "[]"))
         turns.append(turn)
 
     return turns
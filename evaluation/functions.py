@@ -1,14 +1,23 @@
 
 import json
 import shutil
+import threading
 import time
-from collections import Counter
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 from typing import Any, Dict, List, Tuple
 
+import orjson
 import yaml
 
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _YamlLoader
+
 from agents.agent_old import BasicAgent
 from agents.schemes import AgentResult
 from agents.tools.db_tools import safe_query
@@ -20,7 +29,7 @@ def load_yaml_config(config_path: str) -> Dict[str, Any]:
     if not path.exists():
         raise FileNotFoundError(f"Config file not found: {config_path}")
 
-    return yaml.safe_load(path.read_text(encoding="utf-8"))
+    return yaml.load(path.read_text(encoding="utf-8"), Loader=_YamlLoader)
 
 
 def summarize_turns(turns: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -48,22 +57,140 @@ def load_turns_from_config(cfg: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], D
     return turns, summarize_turns(turns)
 
 
-def _canonicalize_rows(rows: List[Any]) -> List[str]:
-    canon = []
-    for r in rows:
-        if isinstance(r, (list, tuple)):
-            canon.append(repr(tuple(r)))
-        else:
-            canon.append(repr((r,)))
-    return sorted(canon)
+def _to_tuple(row: Any) -> Tuple[Any, ...]:
+    return tuple(row) if isinstance(row, (list, tuple)) else (row,)
 
 
 def compare_results(pred_rows: List[Any], gold_rows: List[Any], order_insensitive: bool = True) -> bool:
     if order_insensitive:
-        return _canonicalize_rows(pred_rows) == _canonicalize_rows(gold_rows)
+        return Counter(map(_to_tuple, pred_rows)) == Counter(map(_to_tuple, gold_rows))
     return pred_rows == gold_rows
 
 
+class _ConnectionCache:
+    """
+    Per-thread LRU of open database connections keyed by db_file.
+
+    Connections are not shared across threads because safe_query installs a per-connection progress handler.
+    """
+
+    def __init__(self, maxsize: int = 8):
+        self.maxsize = maxsize
+        self._local = threading.local()
+        self._caches: List["OrderedDict[str, Any]"] = []
+        self._lock = threading.Lock()
+
+    def get(self, db_file: str):
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = OrderedDict()
+            with self._lock:
+                self._caches.append(conns)
+
+        conn = conns.get(db_file)
+        if conn is not None:
+            conns.move_to_end(db_file)
+            return conn
+
+        conn = get_db_connection(db_file)
+        conns[db_file] = conn
+        if len(conns) > self.maxsize:
+            _, evicted = conns.popitem(last=False)
+            evicted.close()
+        return conn
+
+    def close_all(self) -> None:
+        with self._lock:
+            for conns in self._caches:
+                for conn in conns.values():
+                    conn.close()
+                conns.clear()
+            self._caches.clear()
+
+
+def _evaluate_turn(
+    agent: BasicAgent,
+    connections: _ConnectionCache,
+    idx: int,
+    t: Dict[str, Any],
+    *,
+    msx_ms: int,
+    max_steps: int,
+    order_insensitive: bool,
+) -> Dict[str, Any]:
+    question = t.get("text") or t.get("question") or ""
+    db_file = t.get("db_file")
+    turn_uid = t.get("turn_uid") or t.get("id") or idx
+    gold_sql = t.get("gold_sql")
+
+    agent_started = time.monotonic()
+    agent_result: AgentResult = agent.run(
+        question=question,
+        db_file=db_file,
+        msx_ms=msx_ms,
+        max_steps=max_steps,
+    )
+    agent_wall_ms = (time.monotonic() - agent_started) * 1000.0
+
+    pred_sql = agent_result.steps[-1].sql if agent_result.steps else ""
+    pred_exec = agent_result.steps[-1].execution.to_dict() if agent_result.steps else None
+    pred_rows = (
+        agent_result.steps[-1].execution.results if agent_result.steps else []
+    )
+    pred_query_time_ms = None
+    if isinstance(pred_exec, dict) and pred_exec.get("elapsed_ms") is not None:
+        pred_query_time_ms = float(pred_exec.get("elapsed_ms"))
+
+    gold_exec = None
+    gold_rows: List[Any] = []
+    results_match = None
+    gold_query_time_ms = None
+
+    if db_file and gold_sql and str(gold_sql).strip():
+        conn = connections.get(db_file)
+        # Gold rows are fetched in full so the comparison never sees a capped reference.
+        gold_exec = safe_query(conn, str(gold_sql), msx_ms, max_rows=None)
+
+        gold_rows = gold_exec.get("results", []) if isinstance(gold_exec, dict) else []
+
+        if isinstance(gold_exec, dict) and gold_exec.get("elapsed_ms") is not None:
+            gold_query_time_ms = float(gold_exec.get("elapsed_ms"))
+
+        if pred_exec is not None and isinstance(gold_exec, dict):
+            pred_success = bool(pred_exec.get("success"))
+            if pred_success and pred_exec.get("truncated"):
+                # The agent's execution is capped; re-run the prediction uncapped so large
+                # result sets are compared in full, like the gold query above.
+                full_pred_exec = safe_query(conn, str(pred_sql), msx_ms, max_rows=None)
+                pred_success = bool(full_pred_exec.get("success"))
+                pred_rows = full_pred_exec.get("results", [])
+
+            if gold_exec.get("truncated"):
+                results_match = False
+            elif pred_success and bool(gold_exec.get("success")):
+                results_match = compare_results(pred_rows, gold_rows, order_insensitive)
+            else:
+                results_match = False
+
+    return {
+        "turn_uid": turn_uid,
+        "db_file": db_file,
+        "question": question,
+        "gold_sql": gold_sql,
+        "agent_wall_ms": agent_wall_ms,
+        "agent_result": agent_result.to_dict(),
+        "pred_sql": pred_sql,
+        "pred_execution": pred_exec,
+        "pred_query_time_ms": pred_query_time_ms,
+        "gold_execution": gold_exec,
+        "gold_query_time_ms": gold_query_time_ms,
+        "query_time_delta_ms": (pred_query_time_ms - gold_query_time_ms)
+        if (pred_query_time_ms is not None and gold_query_time_ms is not None)
+        else None,
+        "results_match": results_match,
+    }
+
+
 def run_experiment(config_path: str) -> Path:
     cfg = load_yaml_config(config_path)
     experiment_name = str(cfg.get("experiment_name", "experiment")).strip() or "experiment"
@@ -76,12 +203,17 @@ def run_experiment(config_path: str) -> Path:
 
     eval_cfg = cfg.get("eval", {}) or {}
     order_insensitive = bool(eval_cfg.get("compare_order_insensitive", True))
+    workers = max(1, int(eval_cfg.get("workers", 1)))
 
     turns, data_summary = load_turns_from_config(cfg)
     agent = BasicAgent(model=model)
 
+    exp_dir = output_root / experiment_name
+    exp_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(str(config_path), str(exp_dir / "config.yaml"))
+
     started_at = datetime.utcnow().isoformat() + "Z"
-    items = []
+    num_items = 0
 
     match_count = 0
     comparable_count = 0
@@ -90,79 +222,33 @@ def run_experiment(config_path: str) -> Path:
     pred_query_time_count = 0
     gold_query_time_count = 0
 
-    for idx, t in enumerate(turns):
-        question = t.get("text") or t.get("question") or ""
-        db_file = t.get("db_file")
-        turn_uid = t.get("turn_uid") or t.get("id") or idx
-        gold_sql = t.get("gold_sql")
-
-        agent_started = time.monotonic()
-        agent_result: AgentResult = agent.run(
-            question=question,
-            db_file=db_file,
-            msx_ms=msx_ms,
-            max_steps=max_steps,
-        )
-        agent_wall_ms = (time.monotonic() - agent_started) * 1000.0
-
-        pred_sql = agent_result.steps[-1].sql if agent_result.steps else ""
-        pred_exec = agent_result.steps[-1].execution.to_dict() if agent_result.steps else None
-        pred_rows = (
-            agent_result.steps[-1].execution.results if agent_result.steps else []
-        )
-        pred_query_time_ms = None
-        if isinstance(pred_exec, dict) and pred_exec.get("elapsed_ms") is not None:
-            pred_query_time_ms = float(pred_exec.get("elapsed_ms"))
-            pred_query_time_sum_ms += pred_query_time_ms
-            pred_query_time_count += 1
-
-        gold_exec = None
-        gold_rows: List[Any] = []
-        results_match = None
-        gold_query_time_ms = None
-
-        if db_file and gold_sql and str(gold_sql).strip():
-            comparable_count += 1
-            conn = get_db_connection(db_file)
-            try:
-                gold_exec = safe_query(conn, str(gold_sql), msx_ms)
-            finally:
-                conn.close()
-
-            gold_rows = gold_exec.get("results", []) if isinstance(gold_exec, dict) else []
-
-            if isinstance(gold_exec, dict) and gold_exec.get("elapsed_ms") is not None:
-                gold_query_time_ms = float(gold_exec.get("elapsed_ms"))
-                gold_query_time_sum_ms += gold_query_time_ms
-                gold_query_time_count += 1
-
-            if pred_exec is not None and isinstance(gold_exec, dict):
-                if bool(pred_exec.get("success")) and bool(gold_exec.get("success")):
-                    results_match = compare_results(pred_rows, gold_rows, order_insensitive)
-                    if results_match:
-                        match_count += 1
-                else:
-                    results_match = False
-
-        items.append(
-            {
-                "turn_uid": turn_uid,
-                "db_file": db_file,
-                "question": question,
-                "gold_sql": gold_sql,
-                "agent_wall_ms": agent_wall_ms,
-                "agent_result": agent_result.to_dict(),
-                "pred_sql": pred_sql,
-                "pred_execution": pred_exec,
-                "pred_query_time_ms": pred_query_time_ms,
-                "gold_execution": gold_exec,
-                "gold_query_time_ms": gold_query_time_ms,
-                "query_time_delta_ms": (pred_query_time_ms - gold_query_time_ms)
-                if (pred_query_time_ms is not None and gold_query_time_ms is not None)
-                else None,
-                "results_match": results_match,
-            }
-        )
+    # Turns are independent and dominated by LLM round-trips, so evaluate them on a thread pool.
+    # executor.map yields in input order; items are streamed to items.jsonl as they arrive and
+    # only the running metrics are kept in memory.
+    connections = _ConnectionCache()
+    evaluate = partial(
+        _evaluate_turn, agent, connections, msx_ms=msx_ms, max_steps=max_steps, order_insensitive=order_insensitive
+    )
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor, \
+                (exp_dir / "items.jsonl").open("wb") as items_file:
+            for item in executor.map(evaluate, range(len(turns)), turns):
+                items_file.write(orjson.dumps(item) + b"\n")
+                items_file.flush()
+                num_items += 1
+
+                if item["gold_execution"] is not None:
+                    comparable_count += 1
+                if item["results_match"]:
+                    match_count += 1
+                if item["pred_query_time_ms"] is not None:
+                    pred_query_time_sum_ms += item["pred_query_time_ms"]
+                    pred_query_time_count += 1
+                if item["gold_query_time_ms"] is not None:
+                    gold_query_time_sum_ms += item["gold_query_time_ms"]
+                    gold_query_time_count += 1
+    finally:
+        connections.close_all()
 
     finished_at = datetime.utcnow().isoformat() + "Z"
     accuracy = (match_count / comparable_count) if comparable_count else None
@@ -179,14 +265,14 @@ def run_experiment(config_path: str) -> Path:
             "accuracy": accuracy,
             "pred_query_time_avg_ms": (pred_query_time_sum_ms / pred_query_time_count) if pred_query_time_count else None,
             "gold_query_time_avg_ms": (gold_query_time_sum_ms / gold_query_time_count) if gold_query_time_count else None,
+            # Timings from concurrent workers include contention and are not comparable to serial runs
+            "workers": workers,
+            "timings_concurrent": workers > 1,
         },
-        "items": items,
+        "num_items": num_items,
+        "items_file": "items.jsonl",
     }
 
-    exp_dir = output_root / experiment_name
-    exp_dir.mkdir(parents=True, exist_ok=True)
-
-    shutil.copyfile(str(config_path), str(exp_dir / "config.yaml"))
     (exp_dir / "results.json").write_text(
         json.dumps(results_payload, ensure_ascii=False, indent=2), encoding="utf-8"
     )